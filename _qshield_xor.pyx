@@ -0,0 +1,30 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Native fused XOR kernel for the Quantum Shield fallback cipher
+Optional - quantum_shield.py uses it when built, see install_shield.sh
+"""
+
+
+def xor_layers(unsigned char[::1] buf, const unsigned char[::1] key, Py_ssize_t offset, Py_ssize_t total):
+    """XOR the fused layer stream into buf in place
+
+    buf holds bytes [offset, offset + len(buf)) of a total-byte message:
+        buf[j] ^= key[i % klen] ^ key[(total - 1 - i) % klen] ^ ((i + 1) & 0xFF),  i = offset + j
+    """
+    cdef Py_ssize_t n = buf.shape[0]
+    cdef Py_ssize_t klen = key.shape[0]
+    cdef Py_ssize_t i, j
+
+    if klen == 0:
+        raise ValueError('empty key')
+
+    with nogil:
+        if klen == 64:
+            # The KDF's key length - a mask instead of a modulus lets the compiler vectorize
+            for j in range(n):
+                i = offset + j
+                buf[j] ^= key[i & 63] ^ key[(total - 1 - i) & 63] ^ <unsigned char>((i + 1) & 0xFF)
+        else:
+            for j in range(n):
+                i = offset + j
+                buf[j] ^= key[i % klen] ^ key[(total - 1 - i) % klen] ^ <unsigned char>((i + 1) & 0xFF)
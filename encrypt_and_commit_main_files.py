@@ -3,20 +3,33 @@
 Usage: python scripts/shield/encrypt_and_commit_main_files.py <passphrase>
 Environment: set GIT_AUTHOR_NAME/EMAIL if running in CI.
 """
+import os
 import sys
 import json
+import hashlib
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from zipfile import ZipFile
 import tempfile
 
+try:
+    import orjson
+except ImportError:
+    # Optional accelerator - stdlib json is used when orjson is not installed
+    orjson = None
+
 ROOT = Path(__file__).resolve().parents[2]
 MANIFEST = ROOT / 'csv-manifest.json'
 BACKUPS_DIR = ROOT / 'backups'
+# keep git command lines well under ARG_MAX (32k chars on Windows)
+GIT_BATCH_SIZE = 500
+HASH_CHUNK_SIZE = 1 << 20
 
 try:
     from quantum_shield import QuantumShield
+    from git_utils import run_git
 except Exception as e:
     print('Shield import failed:', e)
     raise
@@ -26,13 +39,24 @@ if len(sys.argv) > 1:
 else:
     passphrase = None
     # fall back to env
-    import os
     passphrase = os.environ.get('SHIELD_PASSPHRASE')
 
 if not passphrase:
     print('Passphrase required (CLI arg or SHIELD_PASSPHRASE env)')
     raise SystemExit(1)
 
+# load manifest first so no-op runs skip the (expensive) repo backup
+if orjson is not None:
+    m = orjson.loads(MANIFEST.read_bytes())
+else:
+    m = json.loads(MANIFEST.read_text())
+# raw path strings; Path objects are only built per file when needed
+sensitive = frozenset(it['path'] for it in m if it.get('sensitive'))
+print(f'Files to encrypt: {len(sensitive)}')
+if not sensitive:
+    print('No sensitive files found, nothing to do')
+    raise SystemExit(0)
+
 # create a fresh backup
 print('Creating fresh backup...')
 subprocess.run(['python','scripts/create_repo_backup.py'], check=True)
@@ -44,103 +68,166 @@ if not backups:
 backup_zip = backups[0]
 print('Backup created:', backup_zip)
 
-# load manifest
-m = json.load(open(MANIFEST))
-sensitive = [Path(it['path']) for it in m if it.get('sensitive')]
-print(f'Files to encrypt: {len(sensitive)}')
-if not sensitive:
-    print('No sensitive files found, nothing to do')
-    raise SystemExit(0)
-
 shield = QuantumShield()
 shield.config['delete_original_after_encrypt'] = False
 shield.config['dry_run'] = False
+key = shield.derive_key_once(passphrase)
 
-# keep copies of originals in temp dir for safety
-tmpdir = Path(tempfile.mkdtemp(prefix='shield-'))
+# keep copies of originals in temp dir for safety; it lives next to the repo so
+# the copies can be hardlinks (git rm only drops the repo's link to the inode)
+BACKUPS_DIR.mkdir(parents=True, exist_ok=True)
+safety_dir = tempfile.TemporaryDirectory(prefix='shield-', dir=BACKUPS_DIR, ignore_cleanup_errors=True)
+tmpdir = Path(safety_dir.name)
 orig_copies = []
+to_add = []
+to_rm = []
 failed = False
-try:
-    for p in sensitive:
-        full = ROOT / p
-        if not full.exists():
-            print('Missing file, skipping:', full)
-            continue
-        # copy original to temp
-        tmp = tmpdir / p.name
-        tmp.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(full, tmp)
-        orig_copies.append((full, tmp))
-
-        print('Encrypting', full)
-        ok = shield.encrypt_file(full, passphrase)
-        if not ok:
-            print('Encryption failed for', full)
-            failed = True
-            break
-        enc_path = full.with_suffix(full.suffix + '.enc')
-        if not enc_path.exists():
-            print('Encrypted file missing for', full)
-            failed = True
-            break
-        # stage encrypted and remove plaintext from git
-        subprocess.run(['git','add', str(enc_path)], check=True)
-        subprocess.run(['git','rm','-f', str(full)], check=True)
+
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst, falling back to a full copy across devices or without link support"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def restore_original(tmp, full):
+    """Atomically move a safety copy back into place, copying if it lives on another device"""
+    try:
+        os.replace(tmp, full)
+    except OSError:
+        # copyfile copies in-kernel (sendfile on Linux, fcopyfile on macOS) and skips copystat
+        shutil.copyfile(tmp, full)
+
+
+def stream_digest(f):
+    """SHA-256 of a binary stream, read in 1 MiB chunks so memory use stays constant"""
+    h = hashlib.sha256()
+    for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+        h.update(chunk)
+    return h.digest()
+
+
+def file_digest(path):
+    """SHA-256 of a file on disk"""
+    if hasattr(hashlib, 'file_digest'):
+        # Python 3.11+: hashes straight from the fd into a reused buffer, no per-chunk bytes
+        with open(path, 'rb', buffering=0) as f:
+            return hashlib.file_digest(f, 'sha256').digest()
+    with open(path, 'rb', buffering=HASH_CHUNK_SIZE) as f:
+        return stream_digest(f)
+
+
+def encrypt_one(rel):
+    """Copy one sensitive file to the safety dir and encrypt it (runs in a worker thread)"""
+    full = ROOT / rel
+    if not full.exists():
+        return full, None, False, None
+    # keep the relative layout so files sharing a name cannot clobber each other
+    tmp = tmpdir / rel
+    tmp.parent.mkdir(parents=True, exist_ok=True)
+    link_or_copy(full, tmp)
+    ok = shield.encrypt_file(full, passphrase, key=key)
+    enc_path = full.with_suffix(full.suffix + '.enc')
+    return full, tmp, ok, enc_path
+
+
+def verify_one(index, full, backup_digest):
+    """Decrypt one committed .enc into the temp dir and check it against the backup digest"""
+    enc_path = full.with_suffix(full.suffix + '.enc')
+    out = tmpdir / f'verify_{index}'
+    if not shield.decrypt_file(enc_path, passphrase, key=key, out=out):
+        return 'Decryption failed for'
+    try:
+        if file_digest(out) != backup_digest:
+            return 'Verification mismatch for'
+    finally:
+        out.unlink()
+    return None
+
+
+def git_batched(args, paths):
+    """Run one git command over many paths, split into ARG_MAX-safe batches"""
+    for start in range(0, len(paths), GIT_BATCH_SIZE):
+        run_git(*args, '--', *paths[start:start + GIT_BATCH_SIZE], check=True)
+
+
+with safety_dir:  # removed on the way out, whether we finish, fail or abort
+    # encrypt in parallel; git index updates happen afterwards on the main thread (the index is not thread-safe)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [executor.submit(encrypt_one, rel) for rel in sorted(sensitive)]
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            full, tmp, ok, enc_path = future.result()
+            if tmp is None:
+                print('Missing file, skipping:', full)
+                continue
+            orig_copies.append((full, tmp))
+            if failed:
+                continue
+            if not ok:
+                print('Encryption failed for', full)
+                failed = True
+            elif not enc_path.exists():
+                print('Encrypted file missing for', full)
+                failed = True
+            if failed:
+                for pending in futures:
+                    pending.cancel()
+                continue
+            print('Encrypted', full)
+            to_add.append(str(enc_path))
+            to_rm.append(str(full))
+
+    if not failed:
+        # stage encrypted and remove plaintext from git in one pass each
+        git_batched(['add'], to_add)
+        git_batched(['rm', '-f'], to_rm)
 
     if failed:
         print('Failure during encryption; aborting and reverting staged changes')
-        subprocess.run(['git','reset'], check=False)
+        run_git('reset', check=False)
         # restore originals from tmp copies
         for full, tmp in orig_copies:
             if not full.exists() and tmp.exists():
-                shutil.copy2(tmp, full)
+                restore_original(tmp, full)
         raise SystemExit(1)
 
     # commit & push
-    subprocess.run(['git','commit','-m','chore(shield): encrypt sensitive files and remove plaintext'], check=True)
-    subprocess.run(['git','push','origin','main'], check=True)
+    run_git('commit', '-m', 'chore(shield): encrypt sensitive files and remove plaintext', check=True)
+    run_git('push', 'origin', 'main', check=True)
     print('Encrypted files committed and pushed')
 
-    # verification: extract backup and compare
-    verify_tmp = Path(tempfile.mkdtemp(prefix='shield-verify-'))
+    # verification: hash originals straight out of the backup zip (no extraction)
+    checks = []
     with ZipFile(backup_zip, 'r') as zf:
-        zf.extractall(path=verify_tmp)
-    for full, tmp in orig_copies:
-        rel = full.relative_to(ROOT)
-        orig_in_backup = verify_tmp / rel
-        if not orig_in_backup.exists():
-            print('Warning: original not found in backup for', full)
-            continue
-        # decrypt the encrypted file from repo (use decrypt_file on enc path)
-        enc_path = full.with_suffix(full.suffix + '.enc')
-        # create a temp copy of .enc to avoid altering repo working copy
-        dec_tmp_target = tmpdir / ('dec_' + full.name)
-        # decrypt into repo working (decrypt_file writes original back and deletes .enc), so copy enc to a temporary location and run decrypt on it
-        shutil.copy2(enc_path, enc_path.parent / (enc_path.name + '.tmp'))
-        # rename temp to actual enc file and decrypt
-        test_enc = enc_path.parent / (enc_path.name + '.tmp')
-        # decrypt
-        ok = shield.decrypt_file(test_enc, passphrase)
-        if not ok:
-            print('Decryption failed for', enc_path)
-            failed = True
-            break
-        # compare restored file
-        restored = full
-        if restored.exists():
-            if restored.read_bytes() == orig_in_backup.read_bytes():
-                print('Verified:', full)
-            else:
-                print('Verification mismatch for', full)
+        backup_names = set(zf.namelist())
+        for full, tmp in orig_copies:
+            rel = full.relative_to(ROOT).as_posix()
+            if rel not in backup_names:
+                print('Warning: original not found in backup for', full)
+                continue
+            with zf.open(rel) as original:
+                checks.append((full, tmp, stream_digest(original)))
+
+    # decrypt each .enc into the temp dir (repo working copy untouched) and compare digests in parallel
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = {
+            executor.submit(verify_one, index, full, backup_digest): (full, tmp)
+            for index, (full, tmp, backup_digest) in enumerate(checks)
+        }
+        for future in as_completed(futures):
+            full, tmp = futures[future]
+            error = future.result()
+            if error:
+                print(error, full)
                 failed = True
-                break
-        else:
-            print('Expected restored file not found for', full)
-            failed = True
-            break
-        # cleanup restored file (restore from temp copy later)
-        # move original back from tmp
-        shutil.copy2(tmp, full)
+                continue
+            print('Verified:', full)
+            # put the plaintext back in the working copy (untracked now)
+            restore_original(tmp, full)
 
     if failed:
         print('Verification failed after push; abort and manual review required')
@@ -148,13 +235,4 @@ try:
     else:
         print('Encryption and verification complete and pushed to origin/main')
 
-finally:
-    # cleanup temp dirs
-    shutil.rmtree(tmpdir, ignore_errors=True)
-    # remove verify tmp
-    try:
-        shutil.rmtree(verify_tmp, ignore_errors=True)
-    except Exception:
-        pass
-
 print('Done')
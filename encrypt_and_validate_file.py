@@ -3,6 +3,7 @@
 Usage: python scripts/shield/encrypt_and_validate_file.py <file> <passphrase>
 """
 import sys
+import mmap
 from pathlib import Path
 import shutil
 
@@ -13,6 +14,28 @@ except Exception as e:
     print('Shield import failed:', e)
     raise
 
+
+COMPARE_CHUNK_SIZE = 1 << 20
+
+
+def same_contents(a, b):
+    """Compare two files without reading them into memory - sizes first, then mmap'd memcmp"""
+    size = a.stat().st_size
+    if size != b.stat().st_size:
+        return False
+    if size == 0:
+        return True  # empty files cannot be mmap'd
+    with open(a, 'rb') as fa, open(b, 'rb') as fb:
+        with mmap.mmap(fa.fileno(), 0, access=mmap.ACCESS_READ) as ma, \
+                mmap.mmap(fb.fileno(), 0, access=mmap.ACCESS_READ) as mb:
+            # mmap objects compare by identity, so compare page-cache slices (memcmp), bailing on the first difference
+            for start in range(0, size, COMPARE_CHUNK_SIZE):
+                end = start + COMPARE_CHUNK_SIZE
+                if ma[start:end] != mb[start:end]:
+                    return False
+    return True
+
+
 if len(sys.argv) < 3:
     print('Usage: encrypt_and_validate_file.py <file> <passphrase>')
     raise SystemExit(1)
@@ -28,13 +51,14 @@ shield = QuantumShield()
 # safe settings
 shield.config['delete_original_after_encrypt'] = False
 shield.config['dry_run'] = False
+key = shield.derive_key_once(passphrase)
 
 # copy original to temp for verification
 tmp_orig = file_path.with_suffix(file_path.suffix + '.orig.tmp')
 shutil.copy2(file_path, tmp_orig)
 
 print(f'Encrypting {file_path}...')
-if not shield.encrypt_file(file_path, passphrase):
+if not shield.encrypt_file(file_path, passphrase, key=key):
     print('Encryption failed')
     tmp_orig.unlink(missing_ok=True)
     raise SystemExit(1)
@@ -47,16 +71,14 @@ if not enc_path.exists():
 
 print('Decrypting to verify...')
 # decrypt will write original file back and remove .enc
-if not shield.decrypt_file(enc_path, passphrase):
+if not shield.decrypt_file(enc_path, passphrase, key=key):
     print('Decryption failed')
     tmp_orig.unlink(missing_ok=True)
     raise SystemExit(1)
 
 # now compare
 if file_path.exists():
-    orig_bytes = tmp_orig.read_bytes()
-    new_bytes = file_path.read_bytes()
-    if orig_bytes == new_bytes:
+    if same_contents(tmp_orig, file_path):
         print('Round-trip success: contents match')
     else:
         print('Round-trip mismatch: contents differ')
@@ -16,6 +16,7 @@ def main(argv):
     shield = QuantumShield()
     shield.config['dry_run'] = False
     shield.config['delete_original_after_encrypt'] = delete
+    key = shield.derive_key_once(passphrase)
 
     dirs = [
         'enterprise/departments/executive',
@@ -25,13 +26,14 @@ def main(argv):
     total_encrypted = 0
     total_skipped = 0
 
+    # Directories run one after another - each scan already spreads its files over all cores
     for d in dirs:
         p = Path(d)
         if not p.exists():
             print(f'⚠️  Directory not found: {p}')
             continue
         print(f'🔒 Scanning and encrypting: {p}')
-        enc, skip = shield.scan_and_encrypt_directory(p, passphrase)
+        enc, skip = shield.scan_and_encrypt_directory(p, passphrase, key=key)
         print(f'  ✅ Encrypted: {enc}  ⏭ Skipped: {skip}')
         total_encrypted += enc
         total_skipped += skip
@@ -44,4 +46,4 @@ def main(argv):
 
 
 if __name__ == '__main__':
-    sys.exit(main(sys.argv))
\ No newline at end of file
+    sys.exit(main(sys.argv))
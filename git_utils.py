@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Git command runner shared by the shield hooks and scripts
+Keeps child-process startup cheap on hot paths
+"""
+
+import shutil
+import subprocess
+
+# CPython only uses posix_spawn when the executable is an absolute path and
+# close_fds is False, so resolve git once instead of letting exec search PATH
+GIT_EXECUTABLE = shutil.which('git') or 'git'
+
+def run_git(*args, quiet=False, **kwargs):
+    """Run a git subcommand - extra keyword arguments go to subprocess.run
+
+    quiet: discard stdout/stderr (DEVNULL) instead of piping output nobody reads
+    """
+    if quiet:
+        kwargs.setdefault('stdout', subprocess.DEVNULL)
+        kwargs.setdefault('stderr', subprocess.DEVNULL)
+    # Python 3.4+ file descriptors are non-inheritable by default, so this is safe
+    kwargs.setdefault('close_fds', False)
+    return subprocess.run([GIT_EXECUTABLE, *args], **kwargs)
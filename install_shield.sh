@@ -29,6 +29,19 @@ chmod +x "$SHIELD_SCRIPTS/quantum_shield.py" 2>/dev/null || echo "⚠️  Warnin
 chmod +x "$SHIELD_SCRIPTS/pre_commit_hook.py" 2>/dev/null || echo "⚠️  Warning: Could not chmod pre_commit_hook.py"
 chmod +x "$SHIELD_SCRIPTS/pre_push_hook.py" 2>/dev/null || echo "⚠️  Warning: Could not chmod pre_push_hook.py"
 
+# Build the optional native XOR kernel (fail-safe: the shield runs without it)
+if [ -f "$SHIELD_SCRIPTS/_qshield_xor.pyx" ] && python3 -c "import Cython" 2>/dev/null; then
+    echo "⚙️  Building native XOR kernel..."
+    if (cd "$SHIELD_SCRIPTS" && CFLAGS="-O3 -march=native" python3 -m Cython.Build.Cythonize -i -3 -q _qshield_xor.pyx >/dev/null 2>&1); then
+        echo "✅ Native XOR kernel built"
+    else
+        echo "⚠️  Warning: Could not build native XOR kernel (continuing without it)"
+    fi
+    rm -rf "$SHIELD_SCRIPTS/build" "$SHIELD_SCRIPTS/_qshield_xor.c"
+else
+    echo "ℹ️  Cython not installed, skipping native XOR kernel (pip install cython to enable)"
+fi
+
 # Install pre-commit hook
 echo "🪝 Installing pre-commit hook..."
 cat > "$GIT_HOOKS/pre-commit" << 'EOF'
@@ -92,6 +105,10 @@ if [ -f "$GITIGNORE" ]; then
         echo ".artifact_shield/" >> "$GITIGNORE"
         echo "*.enc.backup" >> "$GITIGNORE"
     fi
+    # Locally built native kernel - compiled for this machine only
+    if ! grep -q "_qshield_xor" "$GITIGNORE" 2>/dev/null; then
+        echo "scripts/shield/_qshield_xor*.so" >> "$GITIGNORE"
+    fi
 fi
 
 # Create initial configuration
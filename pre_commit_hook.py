@@ -14,31 +14,66 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 try:
     from quantum_shield import QuantumShield
+    from git_utils import run_git
 except ImportError:
     print("⚠️  Warning: Shield system not available, skipping encryption check")
     sys.exit(0)
 
-def get_staged_files():
+try:
+    import ahocorasick
+except ImportError:
+    # Optional accelerator - fall back to one byte search per marker
+    ahocorasick = None
+
+# Hot helpers bind globals as default arguments (fast local lookups instead of LOAD_GLOBAL)
+
+def get_staged_files(_run_git=run_git, _fsdecode=os.fsdecode):
     """Get list of staged files"""
     try:
-        result = subprocess.run(
-            ['git', 'diff', '--cached', '--name-only', '--diff-filter=ACM'],
+        # -z: NUL-separated raw paths (no C-style quoting of unusual names, newlines allowed)
+        result = _run_git(
+            'diff', '--cached', '--name-only', '-z', '--diff-filter=ACM',
             capture_output=True,
-            text=True,
             check=True
         )
-        return [f.strip() for f in result.stdout.split('\n') if f.strip()]
+        return [_fsdecode(f) for f in result.stdout.split(b'\x00') if f]
     except subprocess.CalledProcessError:
         return []
 
-def check_file_classification(file_path):
+# Markers are ASCII, so the header is searched as raw bytes (memmem) without decoding
+CLASSIFICATION_MARKERS = (b'TOP_SECRET', b'CONFIDENTIAL', b'RESTRICTED')
+CLASSIFICATION_SCAN_BYTES = 1000
+
+def build_marker_automaton():
+    """Compile all classification markers into one Aho-Corasick automaton (None if unavailable)"""
+    if ahocorasick is None:
+        return None
+    try:
+        automaton = ahocorasick.Automaton()
+        for marker in CLASSIFICATION_MARKERS:
+            automaton.add_word(marker.decode('ascii'), marker)
+        automaton.make_automaton()
+        return automaton
+    except Exception:
+        return None
+
+MARKER_AUTOMATON = build_marker_automaton()
+
+def check_file_classification(file_path, _open=open, _automaton=MARKER_AUTOMATON,
+                              _markers=CLASSIFICATION_MARKERS, _scan_bytes=CLASSIFICATION_SCAN_BYTES):
     """Check if file contains classification markers"""
     try:
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read(1000)  # Check first 1000 chars
-            for classification in ['TOP_SECRET', 'CONFIDENTIAL', 'RESTRICTED']:
-                if classification in content:
-                    return classification
+        with _open(file_path, 'rb') as f:
+            header = f.read(_scan_bytes)  # Check first 1000 bytes
+        if _automaton is not None:
+            # One pass for all markers; latin-1 maps bytes 1:1 to code points and never fails
+            found = {marker for _, marker in _automaton.iter(header.decode('latin-1'))}
+        else:
+            found = header
+        # Report the highest-priority marker present
+        for classification in _markers:
+            if classification in found:
+                return classification.decode('ascii')
     except Exception:
         pass
     return None
@@ -57,7 +92,11 @@ def main():
     unencrypted_sensitive = []
     
     for file_path in staged_files:
-        if not Path(file_path).exists():
+        # .enc files are never reported - decide by name before any stat/open
+        if file_path.endswith('.enc'):
+            continue
+        
+        if not os.path.exists(file_path):
             continue
         
         # Skip excluded files
@@ -67,10 +106,9 @@ def main():
         # Check classification
         classification = check_file_classification(file_path)
         
-        if classification:
-            # Check if encrypted
-            if not shield.is_encrypted(file_path) and not file_path.endswith('.enc'):
-                unencrypted_sensitive.append((file_path, classification))
+        # Only classified files pay for the encryption-marker read
+        if classification and not shield.is_encrypted(file_path):
+            unencrypted_sensitive.append((file_path, classification))
     
     if unencrypted_sensitive:
         print(f"\n⚠️  Found {len(unencrypted_sensitive)} unencrypted sensitive files:")
@@ -85,13 +123,14 @@ def main():
                 print("\n💡 Tip: Set SHIELD_PASSPHRASE environment variable to avoid prompts")
                 passphrase = shield.get_passphrase("Enter passphrase for encryption: ")
 
+            key = shield.derive_key_once(passphrase)
             encrypted_count = 0
             for file_path, classification in unencrypted_sensitive:
-                if shield.encrypt_file(file_path, passphrase):
+                if shield.encrypt_file(file_path, passphrase, key=key):
                     encrypted_count += 1
                     encrypted_path = file_path + '.enc'
-                    subprocess.run(['git', 'add', encrypted_path], check=False)
-                    subprocess.run(['git', 'reset', 'HEAD', file_path], check=False)
+                    run_git('add', encrypted_path, check=False)
+                    run_git('reset', 'HEAD', file_path, check=False)
 
             print(f"✅ Auto-encrypted {encrypted_count} files")
             print("\n💡 Encrypted files have been staged.")
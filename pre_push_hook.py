@@ -6,11 +6,15 @@ Self-healing, fail-proof automation
 
 import sys
 import os
-import subprocess
 import json
 from pathlib import Path
 from datetime import datetime
 
+# Add current directory to path to import shared helpers
+sys.path.insert(0, str(Path(__file__).parent))
+
+from git_utils import run_git
+
 # Configuration
 PURGE_CONFIG_FILE = Path.home() / '.artifact_shield' / 'purge_config.json'
 PURGE_LOG_FILE = Path.home() / '.artifact_shield' / 'history_purge.log'
@@ -58,11 +62,16 @@ def log_purge_event(message):
     except Exception:
         pass
 
-def count_commits():
-    """Count total commits in repository"""
+# Hot helpers bind globals as default arguments (fast local lookups instead of LOAD_GLOBAL)
+
+def count_commits(limit=None, _run_git=run_git):
+    """Count commits reachable from HEAD, stopping the walk after `limit` commits if given"""
+    command = ['rev-list', '--count', 'HEAD']
+    if limit is not None:
+        command[2:2] = ['--max-count', str(limit)]
     try:
-        result = subprocess.run(
-            ['git', 'rev-list', '--count', 'HEAD'],
+        result = _run_git(
+            *command,
             capture_output=True,
             text=True,
             check=True
@@ -71,11 +80,11 @@ def count_commits():
     except Exception:
         return 0
 
-def get_nth_commit_hash(n):
+def get_nth_commit_hash(n, _run_git=run_git):
     """Get hash of nth commit from HEAD"""
     try:
-        result = subprocess.run(
-            ['git', 'rev-parse', f'HEAD~{n}'],
+        result = _run_git(
+            'rev-parse', f'HEAD~{n}',
             capture_output=True,
             text=True,
             check=True
@@ -95,11 +104,7 @@ def create_backup(backup_location):
         backup_path = backup_dir / backup_name
         
         # Create git bundle (complete backup)
-        subprocess.run(
-            ['git', 'bundle', 'create', str(backup_path), '--all'],
-            check=True,
-            capture_output=True
-        )
+        run_git('bundle', 'create', str(backup_path), '--all', check=True, quiet=True)
         
         log_purge_event(f'Backup created: {backup_path}')
         return True
@@ -110,10 +115,11 @@ def create_backup(backup_location):
 def purge_old_commits(keep_commits):
     """Purge commits older than keep_commits"""
     try:
-        total_commits = count_commits()
+        # Bounded probe, as in main() - an exact total would walk all of history just to log it
+        probed_commits = count_commits(limit=keep_commits + 1)
         
-        if total_commits <= keep_commits:
-            log_purge_event(f'No purge needed ({total_commits} commits, keeping {keep_commits})')
+        if probed_commits <= keep_commits:
+            log_purge_event(f'No purge needed ({probed_commits} commits, keeping {keep_commits})')
             return True
         
         # Simplified approach: Create a new orphan branch with squashed history
@@ -122,8 +128,8 @@ def purge_old_commits(keep_commits):
         
         # Get current branch name
         try:
-            result = subprocess.run(
-                ['git', 'rev-parse', '--abbrev-ref', 'HEAD'],
+            result = run_git(
+                'rev-parse', '--abbrev-ref', 'HEAD',
                 capture_output=True,
                 text=True,
                 check=True
@@ -133,7 +139,7 @@ def purge_old_commits(keep_commits):
             current_branch = 'main'
         
         # Create backup branch
-        subprocess.run(['git', 'branch', f'backup_{timestamp}'], check=False, capture_output=True)
+        run_git('branch', f'backup_{timestamp}', check=False, quiet=True)
         
         # Get commit to keep from
         new_root_hash = get_nth_commit_hash(keep_commits - 1)
@@ -141,28 +147,19 @@ def purge_old_commits(keep_commits):
             log_purge_event('Failed to determine new root commit')
             return False
         
-        # Create patch file for recent commits
-        patch_file = Path.home() / '.artifact_shield' / f'patch_{timestamp}.diff'
-        subprocess.run(
-            ['git', 'diff', f'{new_root_hash}~1', 'HEAD'],
-            stdout=open(patch_file, 'w'),
-            check=False
-        )
-        
         # Create orphan branch
-        subprocess.run(['git', 'checkout', '--orphan', temp_branch], check=True, capture_output=True)
-        subprocess.run(['git', 'add', '-A'], check=True, capture_output=True)
-        subprocess.run(['git', 'commit', '-m', f'History purged - kept {keep_commits} commits'], check=True, capture_output=True)
+        run_git('checkout', '--orphan', temp_branch, check=True, quiet=True)
+        run_git('add', '-A', check=True, quiet=True)
+        run_git('commit', '-m', f'History purged - kept {keep_commits} commits', check=True, quiet=True)
         
         # Delete old branch and rename
-        subprocess.run(['git', 'branch', '-D', current_branch], check=False, capture_output=True)
-        subprocess.run(['git', 'branch', '-m', current_branch], check=True, capture_output=True)
+        run_git('branch', '-D', current_branch, check=False, quiet=True)
+        run_git('branch', '-m', current_branch, check=True, quiet=True)
         
         # Cleanup
-        subprocess.run(['git', 'gc', '--aggressive', '--prune=now'], check=False, capture_output=True)
+        run_git('gc', '--aggressive', '--prune=now', check=False, quiet=True)
         
-        purged_count = total_commits - 1  # Now we have 1 commit
-        log_purge_event(f'Purged history: {purged_count} commits removed, squashed into 1 commit')
+        log_purge_event(f'Purged history: more than {keep_commits} commits squashed into 1 commit')
         
         return True
         
@@ -185,10 +182,11 @@ def main():
     
     print(f"🧹 Artifact Shield: Purging old commits (keeping last {config['keep_commits']})...")
     
-    total_commits = count_commits()
+    # Only probe one commit past the keep window - walking all of history on every push is O(history)
+    probed_commits = count_commits(limit=config['keep_commits'] + 1)
     
-    if total_commits <= config['keep_commits']:
-        print(f"✅ No purge needed ({total_commits} commits)")
+    if probed_commits <= config['keep_commits']:
+        print(f"✅ No purge needed ({probed_commits} commits)")
         return 0
     
     # Create backup if enabled
@@ -202,7 +200,7 @@ def main():
                 print("⚠️  Backup failed, but fail-safe mode enabled - continuing")
     
     # Perform purge
-    print(f"🗑️  Purging {total_commits - config['keep_commits']} old commits...")
+    print(f"🗑️  Purging commits older than the last {config['keep_commits']}...")
     
     if purge_old_commits(config['keep_commits']):
         print("✅ History purged successfully")
@@ -6,24 +6,193 @@ Original implementation - No public code references
 
 import os
 import sys
+import atexit
 import json
+import mmap
+import re
 import hashlib
 import secrets
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from multiprocessing.util import Finalize
 from pathlib import Path
 from datetime import datetime
 
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:
+    # Optional dependency - fall back to the built-in multi-layer XOR cipher
+    Cipher = None
+
+try:
+    import numpy as np
+except ImportError:
+    # Optional accelerator - the XOR layers run as pure-Python loops without it
+    np = None
+
+try:
+    import _qshield_xor
+except ImportError:
+    # Optional native XOR kernel - only present once _qshield_xor.pyx has been built
+    _qshield_xor = None
+
 # Configuration paths
 SHIELD_DIR = Path.home() / '.artifact_shield'
 CONFIG_FILE = SHIELD_DIR / 'config.json'
 KEY_FILE = SHIELD_DIR / 'keystore.dat'
 AUDIT_LOG = SHIELD_DIR / 'audit.log'
+AUDIT_BUFFER_SIZE = 1 << 16   # audit entries are batched in memory and written out in bulk
+
+# Package format versions (u16 in the binary header)
+LEGACY_XOR_VERSION = 0x0100   # v1.0: XOR, key hashed from passphrase + salt per file
+XOR_VERSION = 0x0101          # v1.1: XOR, per-file key derived from the cached master key
+AES_GCM_VERSION = 0x0200      # v2.0: AES-256-GCM, per-file key derived from the cached master key
+
+# Binary package header, little-endian:
+#   magic(4) | version(u16) | salt_len(u8) | salt | payload_len(u64) | payload
+PACKAGE_MAGIC = b'QSH1'
+PACKAGE_PREFIX = struct.Struct('<4sHB')
+PACKAGE_PAYLOAD_LENGTH = struct.Struct('<Q')
+SALT_SIZE = 32
+
+# Legacy v1.0 packages are text framed: marker::v1.0::hexsalt::payload (no other version ever was)
+LEGACY_MARKER_WINDOW = 100   # is_encrypted looks for their marker this far into a file
+LEGACY_TEXT_VERSION = b'v1.0'
+
+# AES-256-GCM parameters
+AES_KEY_SIZE = 32
+AES_NONCE_SIZE = 12
+AES_TAG_SIZE = 16
+AES_BLOCK_SIZE = 16
+CIPHER_CHUNK_SIZE = 1 << 20
+AESGCM_MAX_SIZE = (1 << 31) - 1   # one-shot AESGCM limit - larger buffers go through the streaming Cipher
+
+# File I/O buffer - matches the cipher chunk so each chunk is one syscall
+IO_BUFFER_SIZE = CIPHER_CHUNK_SIZE
+
+# Numba XOR kernels - compiled on first use, importing numba costs far more than short runs save.
+# They are single-threaded on purpose: callers already spread files over threads and forked
+# pool workers, and numba's parallel layers are neither safe under concurrent calls nor after fork.
+_xor_kernels = None   # (any key length, 64-byte key) once loaded, () without numba
+_xor_kernels_lock = threading.Lock()
+
+def compile_xor_kernels():
+    """Compile the fused XOR kernels - () if numba is unavailable or broken"""
+    if np is None:
+        return ()
+    try:
+        import numba
+        
+        # nogil: threads calling the kernel on different buffers really run side by side
+        @numba.njit(nogil=True, boundscheck=False, cache=True)
+        def xor_kernel(buf, key, offset, n):
+            key_length = key.shape[0]
+            for j in range(buf.shape[0]):
+                i = offset + j
+                buf[j] ^= key[i % key_length] ^ key[(n - 1 - i) % key_length] ^ np.uint8((i + 1) & 0xFF)
+        
+        # The KDF always yields 64-byte XOR keys: i & 63 instead of a variable modulus lets
+        # LLVM unroll and vectorize. The explicit signature compiles it eagerly.
+        buf_type = numba.types.Array(numba.uint8, 1, 'C')
+        key_type = numba.types.Array(numba.uint8, 1, 'C', readonly=True)
+        
+        @numba.njit(numba.void(buf_type, key_type, numba.int64, numba.int64),
+                    nogil=True, boundscheck=False, cache=True, error_model='numpy')
+        def xor_kernel_64(buf, key, offset, n):
+            for j in range(buf.shape[0]):
+                i = offset + j
+                buf[j] ^= key[i & 63] ^ key[(n - 1 - i) & 63] ^ np.uint8((i + 1) & 0xFF)
+        
+        # Compile now so a broken numba install falls back instead of failing mid-file
+        xor_kernel(np.zeros(1, dtype=np.uint8), np.ones(1, dtype=np.uint8), 0, 1)
+        return xor_kernel, xor_kernel_64
+    except Exception:
+        return ()
+
+def load_xor_kernel(key_length):
+    """Return the Numba-compiled fused XOR kernel for this key length, or None if numba is unavailable"""
+    global _xor_kernels
+    if _xor_kernels is None:
+        # Concurrent first calls would otherwise each compile the kernels
+        with _xor_kernels_lock:
+            if _xor_kernels is None:
+                _xor_kernels = compile_xor_kernels()
+    if not _xor_kernels:
+        return None
+    return _xor_kernels[1] if key_length == 64 else _xor_kernels[0]
+
+# Layer 3 stream: byte i is (i + 1) & 0xFF, repeating every 256 bytes
+POSITION_FACTORS = bytes(range(1, 256)) + b'\x00'
+
+def tile_bytes(pattern, start, length):
+    """length bytes of pattern repeated forever, beginning at index start (mod len(pattern))"""
+    start %= len(pattern)
+    return (pattern * ((start + length) // len(pattern) + 1))[start:start + length]
+
+def walk_files(root):
+    """Yield the path of every file under root as a string
+    
+    One os.scandir pass per directory - the DirEntry type checks come from
+    the directory listing, so no extra stat per file. Like Path.rglob, file
+    symlinks are included, symlinked directories are not descended into and
+    unreadable directories are skipped.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.path
+        except OSError:
+            continue
+
+# Terminal UI - built once; the trailing newline stands in for print()'s
+_BANNER = """
+╔═══════════════════════════════════════════════════════════════╗
+║                                                               ║
+║     🛡️  ARTIFACT VIRTUAL QUANTUM SHIELD 🛡️                   ║
+║                                                               ║
+║           Multi-Layer Encryption System v1.0                  ║
+║              Protecting Your Secrets                          ║
+║                                                               ║
+╚═══════════════════════════════════════════════════════════════╝
+
+"""
+
+_MENU = """
+┌───────────────────────────────────────────────────────────────┐
+│                      MAIN MENU                                │
+├───────────────────────────────────────────────────────────────┤
+│                                                               │
+│  [1] Encrypt File                                             │
+│  [2] Decrypt File                                             │
+│  [3] Encrypt Directory                                        │
+│  [4] Encrypt by Classification (TOP_SECRET, CONFIDENTIAL)     │
+│  [5] Check Encryption Status                                  │
+│  [6] View Audit Log                                           │
+│  [7] Configuration                                            │
+│  [0] Exit                                                     │
+│                                                               │
+└───────────────────────────────────────────────────────────────┘
+
+"""
 
 class QuantumShield:
     """Multi-layer encryption system with self-healing capabilities"""
     
     def __init__(self):
         self.ensure_shield_directory()
+        self._audit_file = self.open_audit_log()
         self.config = self.load_or_create_config()
+        self._master_keys = {}
+        self._exclude_source = None
+        self._exclude_re = None
         
     def ensure_shield_directory(self):
         """Self-healing: Create shield directory if missing"""
@@ -64,19 +233,41 @@ class QuantumShield:
         
         return default_config
     
+    def open_audit_log(self):
+        """Open the audit log once per shield - buffered, closed (and flushed) at exit"""
+        try:
+            audit_file = open(AUDIT_LOG, 'a', buffering=AUDIT_BUFFER_SIZE)
+        except Exception:
+            # Never fail on logging
+            return None
+        atexit.register(audit_file.close)
+        return audit_file
+    
+    def flush_audit_log(self):
+        """Write buffered audit entries out now (before reading the log back)"""
+        try:
+            if self._audit_file is not None:
+                self._audit_file.flush()
+        except Exception:
+            pass
+    
     def log_event(self, message):
         """Fail-proof audit logging"""
         try:
             timestamp = datetime.now().isoformat()
             log_entry = f'{timestamp} | {message}\n'
-            with open(AUDIT_LOG, 'a') as f:
-                f.write(log_entry)
+            if self._audit_file is not None:
+                self._audit_file.write(log_entry)
         except Exception:
             # Never fail on logging
             pass
     
-    def derive_encryption_key(self, user_passphrase, file_salt):
-        """Original key derivation - multi-round hashing"""
+    def derive_encryption_key(self, user_passphrase, file_salt, key_size=64):
+        """Per-file key - one keyed BLAKE2b of the salt under the cached passphrase master key"""
+        return self.derive_file_key(self.derive_key_once(user_passphrase), file_salt, key_size)
+    
+    def _derive_legacy_key(self, user_passphrase, file_salt):
+        """v1.0 key derivation - multi-round hashing, kept only to decrypt old packages"""
         combined = f'{user_passphrase}::{file_salt}'.encode('utf-8')
         
         # Multiple rounds of different hash algorithms for strength
@@ -86,88 +277,389 @@ class QuantumShield:
         
         return round3
     
-    def encrypt_data(self, plaintext_bytes, user_key):
-        """Original encryption using multi-layer XOR with derived keys"""
-        file_salt = secrets.token_hex(32)
-        encryption_key = self.derive_encryption_key(user_key, file_salt)
+    def derive_key_once(self, user_passphrase):
+        """Derive the passphrase master key once and cache it on this instance
+        
+        The cache lives in process memory only - never written to disk - and is
+        dropped by clear_key_cache() or when the process exits.
+        """
+        master_key = self._master_keys.get(user_passphrase)
+        if master_key is None:
+            master_key = hashlib.blake2b(user_passphrase.encode('utf-8'), digest_size=64).digest()
+            self._master_keys[user_passphrase] = master_key
+        return master_key
+    
+    def clear_key_cache(self):
+        """Forget cached master keys (called on shutdown)"""
+        self._master_keys.clear()
+    
+    def derive_file_key(self, master_key, file_salt, key_size=64):
+        """Cheap per-file key - keyed BLAKE2b of the raw salt bytes under the master key"""
+        return hashlib.blake2b(file_salt, key=master_key, digest_size=key_size).digest()
+    
+    def xor_layers(self, data, encryption_key):
+        """Apply the three XOR layers fused into one pass over the data
+        
+        Every layer XORs byte i with a value that depends only on i, n and the key:
+            key[i % klen] ^ key[(n - i - 1) % klen] ^ ((i + 1) & 0xFF)
+        so the layers combine into a single effective key stream, and applying
+        it twice is the identity - encryption and decryption are the same pass.
         
-        # Multi-layer encryption
-        encrypted = bytearray(plaintext_bytes)
+        Copies data once and XORs the copy in place; the bytearray is returned
+        as is, so callers that concatenate it do not pay for a bytes() copy.
+        """
+        buf = bytearray(data)
+        self.xor_layers_into(buf, encryption_key, 0, len(buf))
+        return buf
+    
+    def xor_layers_into(self, buf, encryption_key, offset, total):
+        """XOR the fused layer stream into a writable buffer in place
+        
+        buf holds bytes [offset, offset + len(buf)) of a total-byte message, so a
+        file processed chunk by chunk matches a single pass over the whole data.
+        """
+        length = len(buf)
         key_length = len(encryption_key)
         
-        # Layer 1: XOR with derived key
-        for i in range(len(encrypted)):
-            encrypted[i] ^= encryption_key[i % key_length]
+        if _qshield_xor is not None:
+            # Native C loop - needs neither NumPy nor a JIT warm-up
+            _qshield_xor.xor_layers(buf, bytes(encryption_key), offset, total)
+            return
+        
+        if np is not None:
+            arr = np.frombuffer(buf, dtype=np.uint8)
+            # Read-only view of an immutable key - the type the compiled kernels expect
+            key_arr = np.frombuffer(bytes(encryption_key), dtype=np.uint8)
+            
+            xor_kernel = load_xor_kernel(key_length)
+            if xor_kernel is not None:
+                # Compiled single-threaded loop, GIL released - no temporaries at all
+                xor_kernel(arr, key_arr, offset, total)
+                return
+            
+            # Build the effective key per 1 MiB block to bound temporaries
+            for start in range(0, length, CIPHER_CHUNK_SIZE):
+                block = arr[start:start + CIPHER_CHUNK_SIZE]
+                positions = np.arange(offset + start, offset + start + len(block))
+                if key_length == 64:
+                    # Same specialization as the compiled kernel - a mask instead of a modulus
+                    effective = key_arr[positions & 63]
+                    effective ^= key_arr[(total - 1 - positions) & 63]
+                else:
+                    effective = key_arr[positions % key_length]
+                    effective ^= key_arr[(total - 1 - positions) % key_length]
+                effective ^= ((positions + 1) & 0xFF).astype(np.uint8)
+                block ^= effective
+            return
+        
+        # Pure Python: build each stream with bytes repetition and XOR whole blocks as single
+        # integers, so the work runs in C over machine words instead of once per byte.
+        # key[(total - 1 - i) % klen] is the reversed key read from (i - total) % klen.
+        reverse_key = encryption_key[::-1]
+        view = memoryview(buf)
+        for start in range(0, length, CIPHER_CHUNK_SIZE):
+            block = view[start:start + CIPHER_CHUNK_SIZE]
+            position = offset + start
+            block_length = len(block)
+            word = (int.from_bytes(block, 'little')
+                    ^ int.from_bytes(tile_bytes(encryption_key, position, block_length), 'little')
+                    ^ int.from_bytes(tile_bytes(reverse_key, position - total, block_length), 'little')
+                    ^ int.from_bytes(tile_bytes(POSITION_FACTORS, position, block_length), 'little'))
+            block[:] = word.to_bytes(block_length, 'little')
+    
+    def xor_encrypt(self, plaintext_bytes, encryption_key):
+        """Original encryption using multi-layer XOR with derived keys (bytearray, framed by encrypt_data)"""
+        return self.xor_layers(plaintext_bytes, encryption_key)
+    
+    def xor_decrypt(self, encrypted, encryption_key):
+        """Original decryption - reverse of the XOR layers"""
+        return bytes(self.xor_layers(encrypted, encryption_key))
+    
+    def aes_gcm_encrypt(self, plaintext_bytes, encryption_key, associated_data):
+        """AES-256-GCM through OpenSSL (AES-NI/PCLMULQDQ) - returns nonce + ciphertext + tag"""
+        nonce = secrets.token_bytes(AES_NONCE_SIZE)
+        if len(plaintext_bytes) <= AESGCM_MAX_SIZE:
+            # Single OpenSSL call, ciphertext and tag in one output buffer
+            return nonce + AESGCM(encryption_key[:AES_KEY_SIZE]).encrypt(nonce, plaintext_bytes, associated_data)
+        
+        encryptor = Cipher(algorithms.AES(encryption_key[:AES_KEY_SIZE]), modes.GCM(nonce)).encryptor()
+        encryptor.authenticate_additional_data(associated_data)
         
-        # Layer 2: Reverse XOR for additional complexity
-        for i in range(len(encrypted) - 1, -1, -1):
-            encrypted[i] ^= encryption_key[(len(encrypted) - i - 1) % key_length]
+        view = memoryview(plaintext_bytes)
+        parts = [nonce]
+        for start in range(0, len(view), CIPHER_CHUNK_SIZE):
+            parts.append(encryptor.update(view[start:start + CIPHER_CHUNK_SIZE]))
+        parts.append(encryptor.finalize())
+        parts.append(encryptor.tag)
+        return b''.join(parts)
+    
+    def aes_gcm_decrypt(self, payload, encryption_key, associated_data):
+        """Reverse of aes_gcm_encrypt - raises InvalidTag on a wrong key or tampering"""
+        if len(payload) < AES_NONCE_SIZE + AES_TAG_SIZE:
+            raise ValueError('Truncated AES-GCM payload')
+        
+        view = memoryview(payload)
+        nonce = bytes(view[:AES_NONCE_SIZE])
+        if len(view) - AES_NONCE_SIZE <= AESGCM_MAX_SIZE:
+            # cryptography < 40 only takes bytes here, not a memoryview slice
+            return AESGCM(encryption_key[:AES_KEY_SIZE]).decrypt(nonce, bytes(view[AES_NONCE_SIZE:]), associated_data)
+        
+        tag = bytes(view[-AES_TAG_SIZE:])
+        ciphertext = view[AES_NONCE_SIZE:-AES_TAG_SIZE]
+        
+        decryptor = Cipher(algorithms.AES(encryption_key[:AES_KEY_SIZE]), modes.GCM(nonce, tag)).decryptor()
+        decryptor.authenticate_additional_data(associated_data)
+        
+        parts = []
+        for start in range(0, len(ciphertext), CIPHER_CHUNK_SIZE):
+            parts.append(decryptor.update(ciphertext[start:start + CIPHER_CHUNK_SIZE]))
+        parts.append(decryptor.finalize())
+        return b''.join(parts)
+    
+    def pack_header(self, version, file_salt, payload_length):
+        """Binary package header - also the AES-GCM associated data"""
+        return (PACKAGE_PREFIX.pack(PACKAGE_MAGIC, version, len(file_salt)) + file_salt
+                + PACKAGE_PAYLOAD_LENGTH.pack(payload_length))
+    
+    def parse_package(self, encrypted_package):
+        """Split a package into (version, salt, payload, associated_data)
+        
+        Reads the binary header by offset without scanning the payload; packages
+        without the magic are parsed as the legacy v1.0 text framing. Returns None
+        if the package is not recognised.
+        """
+        view = memoryview(encrypted_package)
+        
+        if view[:len(PACKAGE_MAGIC)] == PACKAGE_MAGIC:
+            _, version, salt_length = PACKAGE_PREFIX.unpack_from(view, 0)
+            offset = PACKAGE_PREFIX.size
+            file_salt = bytes(view[offset:offset + salt_length])
+            offset += salt_length
+            payload_length, = PACKAGE_PAYLOAD_LENGTH.unpack_from(view, offset)
+            offset += PACKAGE_PAYLOAD_LENGTH.size
+            payload = view[offset:offset + payload_length]
+            if len(payload) != payload_length:
+                raise ValueError('Truncated package')
+            return version, file_salt, payload, bytes(view[:offset])
+        
+        parts = bytes(encrypted_package).split(b'::', 3)
+        if len(parts) != 4:
+            return None
+        
+        marker, text_version, salt_bytes, payload = parts
+        
+        # Verify marker
+        if marker.decode('utf-8') != self.config['encryption_marker']:
+            return None
+        
+        if text_version != LEGACY_TEXT_VERSION:
+            raise ValueError(f'unknown package version {text_version!r}')
+        
+        return LEGACY_XOR_VERSION, bytes.fromhex(salt_bytes.decode('ascii')), payload, marker + b'::' + text_version
+    
+    def encrypt_data(self, plaintext_bytes, user_key, key=None):
+        """Encrypt with AES-256-GCM when available, multi-layer XOR otherwise
         
-        # Layer 3: Position-dependent XOR
-        for i in range(len(encrypted)):
-            position_factor = (i + 1) % 256
-            encrypted[i] ^= position_factor
+        key: optional master key from derive_key_once(), skips the passphrase KDF
+        """
+        file_salt = secrets.token_bytes(SALT_SIZE)
+        master_key = key if key is not None else self.derive_key_once(user_key)
         
-        # Package with metadata
-        marker = self.config['encryption_marker'].encode('utf-8')
-        version = b'v1.0'
-        salt_bytes = file_salt.encode('utf-8')
+        if Cipher is not None:
+            header = self.pack_header(AES_GCM_VERSION, file_salt,
+                                      AES_NONCE_SIZE + len(plaintext_bytes) + AES_TAG_SIZE)
+            encryption_key = self.derive_file_key(master_key, file_salt, AES_KEY_SIZE)
+            # Authenticate the header so the version/salt/length cannot be swapped
+            payload = self.aes_gcm_encrypt(plaintext_bytes, encryption_key, header)
+        else:
+            header = self.pack_header(XOR_VERSION, file_salt, len(plaintext_bytes))
+            encryption_key = self.derive_file_key(master_key, file_salt)
+            payload = self.xor_encrypt(plaintext_bytes, encryption_key)
         
-        package = marker + b'::' + version + b'::' + salt_bytes + b'::' + bytes(encrypted)
-        return package
+        return header + payload
     
-    def decrypt_data(self, encrypted_package, user_key):
-        """Original decryption - reverse of encryption process"""
+    def decrypt_data(self, encrypted_package, user_key, key=None):
+        """Decrypt a package written by encrypt_data (AES-GCM or XOR, any version)
+        
+        key: optional master key from derive_key_once(); legacy v1.0 packages
+        always derive from the passphrase
+        """
         try:
-            # Parse package
-            parts = encrypted_package.split(b'::', 3)
-            if len(parts) != 4:
+            package = self.parse_package(encrypted_package)
+            if package is None:
                 return None
             
-            marker, version, salt_bytes, encrypted = parts
-            
-            # Verify marker
-            if marker.decode('utf-8') != self.config['encryption_marker']:
-                return None
+            version, file_salt, encrypted, associated_data = package
             
-            file_salt = salt_bytes.decode('utf-8')
-            encryption_key = self.derive_encryption_key(user_key, file_salt)
+            if version == LEGACY_XOR_VERSION:
+                # v1.0 hashes the hex text of the salt
+                encryption_key = self._derive_legacy_key(user_key, file_salt.hex())
+                return self.xor_decrypt(encrypted, encryption_key)
             
-            # Reverse layer 3: Position-dependent XOR
-            decrypted = bytearray(encrypted)
-            for i in range(len(decrypted)):
-                position_factor = (i + 1) % 256
-                decrypted[i] ^= position_factor
+            master_key = key if key is not None else self.derive_key_once(user_key)
             
-            # Reverse layer 2: Reverse XOR
-            key_length = len(encryption_key)
-            for i in range(len(decrypted) - 1, -1, -1):
-                decrypted[i] ^= encryption_key[(len(decrypted) - i - 1) % key_length]
+            if version == AES_GCM_VERSION:
+                if Cipher is None:
+                    self.log_event('Decryption failed: AES-GCM package requires the cryptography package')
+                    return None
+                encryption_key = self.derive_file_key(master_key, file_salt, AES_KEY_SIZE)
+                return self.aes_gcm_decrypt(encrypted, encryption_key, associated_data)
             
-            # Reverse layer 1: XOR with derived key
-            for i in range(len(decrypted)):
-                decrypted[i] ^= encryption_key[i % key_length]
+            if version == XOR_VERSION:
+                encryption_key = self.derive_file_key(master_key, file_salt)
+                return self.xor_decrypt(encrypted, encryption_key)
             
-            return bytes(decrypted)
+            self.log_event(f'Decryption failed: unknown package version {version:#06x}')
+            return None
         except Exception as error:
             self.log_event(f'Decryption failed: {error}')
             return None
     
+    def read_chunks(self, src, view, size):
+        """Read exactly size bytes from src into view, yielding the length of each chunk"""
+        remaining = size
+        while remaining:
+            count = src.readinto(view[:min(remaining, len(view))])
+            if not count:
+                raise ValueError('Unexpected end of file')
+            remaining -= count
+            yield count
+    
+    def encrypt_stream(self, plaintext, dst, master_key):
+        """Encrypt a plaintext buffer (e.g. a mapped file) into dst as one package, one chunk at a time"""
+        file_salt = secrets.token_bytes(SALT_SIZE)
+        size = len(plaintext)
+        
+        if Cipher is not None:
+            payload_length = AES_NONCE_SIZE + size + AES_TAG_SIZE
+            header = self.pack_header(AES_GCM_VERSION, file_salt, payload_length)
+        else:
+            payload_length = size
+            header = self.pack_header(XOR_VERSION, file_salt, payload_length)
+        
+        # The package size is known up front - size the file once so writes never extend it
+        os.ftruncate(dst.fileno(), len(header) + payload_length)
+        dst.write(header)
+        
+        if Cipher is not None:
+            nonce = secrets.token_bytes(AES_NONCE_SIZE)
+            encryption_key = self.derive_file_key(master_key, file_salt, AES_KEY_SIZE)
+            encryptor = Cipher(algorithms.AES(encryption_key), modes.GCM(nonce)).encryptor()
+            encryptor.authenticate_additional_data(header)
+            
+            dst.write(nonce)
+            # AES reads the plaintext where it is - no copy into a staging buffer
+            out = memoryview(bytearray(CIPHER_CHUNK_SIZE + AES_BLOCK_SIZE - 1))
+            for start in range(0, size, CIPHER_CHUNK_SIZE):
+                dst.write(out[:encryptor.update_into(plaintext[start:start + CIPHER_CHUNK_SIZE], out)])
+            dst.write(encryptor.finalize())
+            dst.write(encryptor.tag)
+        else:
+            encryption_key = self.derive_file_key(master_key, file_salt)
+            # The XOR kernels work in place, so each chunk is copied into one reused buffer
+            chunk = memoryview(bytearray(CIPHER_CHUNK_SIZE))
+            for start in range(0, size, CIPHER_CHUNK_SIZE):
+                count = min(CIPHER_CHUNK_SIZE, size - start)
+                chunk[:count] = plaintext[start:start + count]
+                self.xor_layers_into(chunk[:count], encryption_key, start, size)
+                dst.write(chunk[:count])
+    
+    def decrypt_stream(self, src, dst, user_key, key=None):
+        """Decrypt the package in src into dst one chunk at a time - returns False on failure
+        
+        AES-GCM plaintext is unauthenticated until the tag is checked at the end,
+        so dst must be a temporary file that is discarded when this fails.
+        """
+        try:
+            prefix = src.read(PACKAGE_PREFIX.size)
+            if not prefix.startswith(PACKAGE_MAGIC):
+                # Legacy v1.0 text-framed package - no length to stream by, decrypt in memory
+                plaintext = self.decrypt_data(prefix + src.read(), user_key, key=key)
+                if plaintext is None:
+                    return False
+                dst.write(plaintext)
+                return True
+            
+            _, version, salt_length = PACKAGE_PREFIX.unpack(prefix)
+            file_salt = src.read(salt_length)
+            length_bytes = src.read(PACKAGE_PAYLOAD_LENGTH.size)
+            if len(file_salt) != salt_length or len(length_bytes) != PACKAGE_PAYLOAD_LENGTH.size:
+                raise ValueError('Truncated package')
+            payload_length, = PACKAGE_PAYLOAD_LENGTH.unpack(length_bytes)
+            header = prefix + file_salt + length_bytes
+            
+            if version not in (AES_GCM_VERSION, XOR_VERSION) or (version == AES_GCM_VERSION and Cipher is None):
+                # Other versions (and their error reporting) go through the in-memory path
+                plaintext = self.decrypt_data(header + src.read(), user_key, key=key)
+                if plaintext is None:
+                    return False
+                dst.write(plaintext)
+                return True
+            
+            master_key = key if key is not None else self.derive_key_once(user_key)
+            chunk = memoryview(bytearray(CIPHER_CHUNK_SIZE))
+            
+            if version == AES_GCM_VERSION:
+                if payload_length < AES_NONCE_SIZE + AES_TAG_SIZE:
+                    raise ValueError('Truncated AES-GCM payload')
+                nonce = src.read(AES_NONCE_SIZE)
+                encryption_key = self.derive_file_key(master_key, file_salt, AES_KEY_SIZE)
+                decryptor = Cipher(algorithms.AES(encryption_key), modes.GCM(nonce)).decryptor()
+                decryptor.authenticate_additional_data(header)
+                
+                out = memoryview(bytearray(CIPHER_CHUNK_SIZE + AES_BLOCK_SIZE - 1))
+                for count in self.read_chunks(src, chunk, payload_length - AES_NONCE_SIZE - AES_TAG_SIZE):
+                    dst.write(out[:decryptor.update_into(chunk[:count], out)])
+                tag = src.read(AES_TAG_SIZE)
+                if len(tag) != AES_TAG_SIZE:
+                    raise ValueError('Truncated package')
+                # Raises InvalidTag on a wrong key or tampering
+                dst.write(decryptor.finalize_with_tag(tag))
+            else:
+                encryption_key = self.derive_file_key(master_key, file_salt)
+                offset = 0
+                for count in self.read_chunks(src, chunk, payload_length):
+                    self.xor_layers_into(chunk[:count], encryption_key, offset, payload_length)
+                    dst.write(chunk[:count])
+                    offset += count
+            
+            return True
+        except Exception as error:
+            self.log_event(f'Decryption failed: {error}')
+            return False
+    
     def is_encrypted(self, file_path):
-        """Check if file is already encrypted"""
+        """Check if file is already encrypted - the magic at offset 0, or an older text-framed marker"""
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(100)
-                return self.config['encryption_marker'].encode('utf-8') in header
-        except Exception:
+            # Raw descriptor + one pread - no buffered file object for a few header bytes
+            fd = os.open(file_path, os.O_RDONLY)
+            try:
+                header = os.pread(fd, LEGACY_MARKER_WINDOW, 0)
+            finally:
+                os.close(fd)
+        except (OSError, TypeError, ValueError):
+            return False
+        
+        if header.startswith(PACKAGE_MAGIC):
+            return True
+        if len(header) < len(PACKAGE_MAGIC):
+            # Shorter than any package
             return False
+        # Text-framed packages: marker within the first 100 bytes
+        return self.config['encryption_marker'].encode('utf-8') in header
     
     def should_exclude(self, file_path):
         """Check if file should be excluded from encryption"""
+        patterns = tuple(self.config['exclude_patterns'])
+        if patterns != self._exclude_source:
+            # One alternation of all patterns - a single scan of each path instead of one per pattern.
+            # Keyed on the patterns' values, so in-place edits to the list recompile it too.
+            self._exclude_re = re.compile('|'.join(map(re.escape, patterns))) if patterns else None
+            self._exclude_source = patterns
+        
         file_str = str(file_path)
-        for pattern in self.config['exclude_patterns']:
-            if pattern in file_str:
-                return True
+        if self._exclude_re is not None and self._exclude_re.search(file_str):
+            return True
         
         # Don't encrypt the encryption tool itself
         if file_str.endswith('quantum_shield.py'):
@@ -192,8 +684,17 @@ class QuantumShield:
             
             return passphrase
     
-    def encrypt_file(self, file_path, user_key):
-        """Encrypt a single file - fail-proof"""
+    def temp_path_for(self, path):
+        """Unique hidden temporary path next to path - same filesystem, so os.replace is atomic"""
+        return path.with_name(f'.{path.name}.{secrets.token_hex(4)}.tmp')
+    
+    def encrypt_file(self, file_path, user_key, key=None):
+        """Encrypt a single file - fail-proof (key: optional pre-derived master key)
+        
+        The plaintext is memory-mapped: a file that grows while it is encrypted is
+        rejected, but truncating it in place meanwhile is unsupported (the mapping
+        faults with SIGBUS and takes the process down).
+        """
         try:
             file_path = Path(file_path)
             
@@ -207,17 +708,34 @@ class QuantumShield:
                 self.log_event(f'Already encrypted: {file_path}')
                 return True
             
-            # Read plaintext
-            with open(file_path, 'rb') as f:
-                plaintext = f.read()
-            
-            # Encrypt
-            encrypted = self.encrypt_data(plaintext, user_key)
-            
-            # Write encrypted
+            master_key = key if key is not None else self.derive_key_once(user_key)
             encrypted_path = file_path.parent / (file_path.name + '.enc')
-            with open(encrypted_path, 'wb') as f:
-                f.write(encrypted)
+            
+            # Map the plaintext and encrypt it in fixed-size chunks (memory stays bounded), into
+            # a temporary file that only replaces the .enc once it is complete and on disk
+            tmp_path = self.temp_path_for(encrypted_path)
+            try:
+                with open(file_path, 'rb') as src, \
+                        open(tmp_path, 'xb', buffering=IO_BUFFER_SIZE) as dst:
+                    size = os.fstat(src.fileno()).st_size
+                    if size:
+                        # Read straight from the page cache instead of copying through read()
+                        with mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                                memoryview(mm) as plaintext:
+                            size = len(mm)
+                            self.encrypt_stream(plaintext, dst, master_key)
+                    else:
+                        # Empty files cannot be mapped
+                        self.encrypt_stream(b'', dst, master_key)
+                    # The package covers only the mapped bytes - refuse a file that grew meanwhile
+                    if os.fstat(src.fileno()).st_size != size:
+                        raise ValueError('File changed during encryption')
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.replace(tmp_path, encrypted_path)
+            finally:
+                # Never leave a truncated package behind
+                tmp_path.unlink(missing_ok=True)
             
             # Optionally remove original only if configured
             if self.config.get('delete_original_after_encrypt') and not self.config.get('dry_run'):
@@ -233,8 +751,12 @@ class QuantumShield:
             self.log_event(f'Encryption error for {file_path}: {error}')
             return False
     
-    def decrypt_file(self, file_path, user_key):
-        """Decrypt a single file - fail-proof"""
+    def decrypt_file(self, file_path, user_key, key=None, out=None):
+        """Decrypt a single file - fail-proof (key: optional pre-derived master key)
+        
+        out: write the plaintext here and keep the .enc file, instead of
+        restoring it next to the .enc and removing the encrypted copy
+        """
         try:
             file_path = Path(file_path)
             
@@ -243,24 +765,29 @@ class QuantumShield:
                 print(f'⚠️  Not an encrypted file: {file_path}')
                 return False
             
-            # Read encrypted
-            with open(file_path, 'rb') as f:
-                encrypted = f.read()
+            original_path = Path(out) if out is not None else file_path.parent / file_path.stem  # Remove .enc
             
-            # Decrypt
-            plaintext = self.decrypt_data(encrypted, user_key)
+            # Stream into a temporary file, renamed over the target only once decryption succeeded
+            tmp_path = self.temp_path_for(original_path)
+            try:
+                with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as src, \
+                        open(tmp_path, 'xb', buffering=IO_BUFFER_SIZE) as dst:
+                    decrypted = self.decrypt_stream(src, dst, user_key, key=key)
+                    if decrypted:
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                if decrypted:
+                    os.replace(tmp_path, original_path)
+            finally:
+                tmp_path.unlink(missing_ok=True)
             
-            if plaintext is None:
+            if not decrypted:
                 print(f'❌ Decryption failed: {file_path} (wrong passphrase?)')
                 return False
             
-            # Write plaintext
-            original_path = file_path.parent / file_path.stem  # Remove .enc
-            with open(original_path, 'wb') as f:
-                f.write(plaintext)
-            
-            # Remove encrypted
-            file_path.unlink()
+            # Remove encrypted (explicit output paths leave the source alone)
+            if out is None:
+                file_path.unlink()
             
             self.log_event(f'Decrypted: {file_path} -> {original_path}')
             return True
@@ -269,27 +796,58 @@ class QuantumShield:
             self.log_event(f'Decryption error for {file_path}: {error}')
             return False
     
-    def scan_and_encrypt_directory(self, directory, user_key, classification=None):
-        """Scan directory and encrypt classified files"""
+    def scan_file(self, file_path, user_key, classification=None, key=None):
+        """Encrypt one scanned file - None if it does not carry the classification
+        
+        classification: encoded marker bytes, searched for in the first 500 bytes
+        """
+        # The walk trusts names - .enc files are existing packages, not candidates
+        if os.fspath(file_path).endswith('.enc'):
+            return None
+        
+        # Check if file should be encrypted based on classification
+        if classification:
+            try:
+                with open(file_path, 'rb') as f:
+                    # Empty files cannot be mapped (and cannot carry a marker)
+                    if not os.fstat(f.fileno()).st_size:
+                        return None
+                    # Search the page cache directly - no read copy, no decode
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        if mm.find(classification, 0, 500) < 0:
+                            return None
+            except Exception:
+                return None
+        
+        return self.encrypt_file(file_path, user_key, key=key)
+    
+    def scan_and_encrypt_directory(self, directory, user_key, classification=None, key=None):
+        """Scan directory and encrypt classified files - files are spread over worker processes"""
         directory = Path(directory)
+        if key is None:
+            key = self.derive_key_once(user_key)
         encrypted_count = 0
         skipped_count = 0
         
-        for file_path in directory.rglob('*'):
-            if not file_path.is_file():
+        if classification:
+            classification = classification.encode('utf-8')
+        
+        paths = list(walk_files(directory))
+        workers = min(len(paths), os.cpu_count() or 1)
+        
+        if workers > 1:
+            scan = partial(_scan_worker, user_key=user_key, classification=classification, key=key)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_scan_worker,
+                                     initargs=(self.config,)) as executor:
+                results = list(executor.map(scan, paths, chunksize=16))
+        else:
+            # Not worth starting a pool for a single file
+            results = [self.scan_file(file_path, user_key, classification, key) for file_path in paths]
+        
+        for result in results:
+            if result is None:
                 continue
-            
-            # Check if file should be encrypted based on classification
-            if classification:
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        first_lines = f.read(500)
-                        if classification not in first_lines:
-                            continue
-                except Exception:
-                    continue
-            
-            if self.encrypt_file(file_path, user_key):
+            if result:
                 encrypted_count += 1
             else:
                 skipped_count += 1
@@ -298,37 +856,11 @@ class QuantumShield:
     
     def display_banner(self):
         """Display shield banner"""
-        banner = """
-╔═══════════════════════════════════════════════════════════════╗
-║                                                               ║
-║     🛡️  ARTIFACT VIRTUAL QUANTUM SHIELD 🛡️                   ║
-║                                                               ║
-║           Multi-Layer Encryption System v1.0                  ║
-║              Protecting Your Secrets                          ║
-║                                                               ║
-╚═══════════════════════════════════════════════════════════════╝
-"""
-        print(banner)
+        sys.stdout.write(_BANNER)
     
     def display_menu(self):
         """Display interactive menu"""
-        menu = """
-┌───────────────────────────────────────────────────────────────┐
-│                      MAIN MENU                                │
-├───────────────────────────────────────────────────────────────┤
-│                                                               │
-│  [1] Encrypt File                                             │
-│  [2] Decrypt File                                             │
-│  [3] Encrypt Directory                                        │
-│  [4] Encrypt by Classification (TOP_SECRET, CONFIDENTIAL)     │
-│  [5] Check Encryption Status                                  │
-│  [6] View Audit Log                                           │
-│  [7] Configuration                                            │
-│  [0] Exit                                                     │
-│                                                               │
-└───────────────────────────────────────────────────────────────┘
-"""
-        print(menu)
+        sys.stdout.write(_MENU)
     
     def run_interactive(self):
         """Run interactive terminal UI"""
@@ -414,14 +946,11 @@ class QuantumShield:
                 encrypted_files = []
                 plaintext_files = []
                 
-                for file_path in directory.rglob('*'):
-                    if not file_path.is_file():
-                        continue
-                    
+                for file_path in walk_files(directory):
                     if self.should_exclude(file_path):
                         continue
                     
-                    if str(file_path).endswith('.enc') or self.is_encrypted(file_path):
+                    if file_path.endswith('.enc') or self.is_encrypted(file_path):
                         encrypted_files.append(file_path)
                     else:
                         plaintext_files.append(file_path)
@@ -436,6 +965,7 @@ class QuantumShield:
                         print(f'    - {f}')
             
             elif choice == '6':
+                self.flush_audit_log()
                 if AUDIT_LOG.exists():
                     print('\n📋 Recent Audit Log Entries:\n')
                     with open(AUDIT_LOG, 'r') as f:
@@ -458,10 +988,33 @@ class QuantumShield:
             print('\n' * 2)
 
 
+# One shield per scan worker process, created by the pool initializer
+_worker_shield = None
+
+def _init_scan_worker(config):
+    """Pool initializer - build the worker's shield with the parent's live config"""
+    global _worker_shield
+    _worker_shield = QuantumShield()
+    _worker_shield.config = config
+    # Pool workers leave through os._exit, which skips atexit - flush the audit log as they shut down
+    Finalize(_worker_shield, _worker_shield.flush_audit_log, exitpriority=10)
+
+def _scan_worker(file_path, user_key, classification, key):
+    """Scan one file in a worker process"""
+    return _worker_shield.scan_file(file_path, user_key, classification, key)
+
+
 def main():
     """Main entry point"""
     shield = QuantumShield()
-    
+    try:
+        return run_cli(shield)
+    finally:
+        shield.clear_key_cache()
+
+
+def run_cli(shield):
+    """Validate the shield, then dispatch the command line or interactive UI"""
     # Run automatic validation tests (dry mode - always runs)
     try:
         sys.path.insert(0, str(Path(__file__).parent))
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Package format regression checks - legacy v1.0 fixture plus binary-header round trips.
+Usage: python scripts/shield/test_package_formats.py
+The test_* functions are plain asserts, so pytest can collect them as well.
+"""
+import sys
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+import quantum_shield
+from quantum_shield import (QuantumShield, PACKAGE_MAGIC, XOR_VERSION, AES_GCM_VERSION,
+                            LEGACY_XOR_VERSION, CIPHER_CHUNK_SIZE)
+
+TEST_DATA = Path(__file__).parent / 'test_data'
+# Written by the original v1.0 cipher - never regenerate it with the current code
+LEGACY_PLAINTEXT = TEST_DATA / 'legacy_v1_0.txt'
+LEGACY_PACKAGE = TEST_DATA / 'legacy_v1_0.txt.enc'
+LEGACY_PASSPHRASE = 'legacy-fixture-pass'
+
+PASSPHRASE = 'format-check-passphrase'
+# Empty, single byte, and more than one cipher chunk (also spans many AES blocks)
+PAYLOAD_SIZES = (0, 1, 2 * CIPHER_CHUNK_SIZE + 17)
+
+
+@contextmanager
+def xor_fallback():
+    """Force the XOR cipher even when cryptography is installed"""
+    saved = quantum_shield.Cipher
+    quantum_shield.Cipher = None
+    try:
+        yield
+    finally:
+        quantum_shield.Cipher = saved
+
+
+def payload(size):
+    """Deterministic, non-repeating-looking test bytes"""
+    return bytes((i * 131 + (i >> 8)) & 0xFF for i in range(size))
+
+
+def check_round_trip(shield, expected_version):
+    for size in PAYLOAD_SIZES:
+        data = payload(size)
+
+        # In memory
+        package = shield.encrypt_data(data, PASSPHRASE)
+        assert package.startswith(PACKAGE_MAGIC), size
+        version = shield.parse_package(package)[0]
+        assert version == expected_version, (size, hex(version))
+        assert shield.decrypt_data(package, PASSPHRASE) == data, size
+
+        # Streaming file path
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / 'sample.bin'
+            source.write_bytes(data)
+            assert shield.encrypt_file(source, PASSPHRASE), size
+            restored = Path(tmp) / 'restored.bin'
+            assert shield.decrypt_file(Path(tmp) / 'sample.bin.enc', PASSPHRASE, out=restored), size
+            assert restored.read_bytes() == data, size
+
+
+def test_legacy_v1_0_fixture():
+    """A package written by the v1.0 cipher still decrypts, in memory and from disk"""
+    shield = QuantumShield()
+    plaintext = LEGACY_PLAINTEXT.read_bytes()
+    package = LEGACY_PACKAGE.read_bytes()
+
+    assert shield.parse_package(package)[0] == LEGACY_XOR_VERSION
+    assert shield.decrypt_data(package, LEGACY_PASSPHRASE) == plaintext
+
+    with tempfile.TemporaryDirectory() as tmp:
+        restored = Path(tmp) / 'legacy.txt'
+        assert shield.decrypt_file(LEGACY_PACKAGE, LEGACY_PASSPHRASE, out=restored)
+        assert restored.read_bytes() == plaintext
+
+
+def test_text_framing_other_versions_rejected():
+    """Only v1.0 was ever text framed - anything else is not a package"""
+    shield = QuantumShield()
+    package = LEGACY_PACKAGE.read_bytes().replace(b'::v1.0::', b'::v1.1::', 1)
+    assert shield.decrypt_data(package, LEGACY_PASSPHRASE) is None
+
+
+def test_xor_binary_round_trip():
+    """XOR packages (0x0101) round-trip empty, tiny and multi-chunk payloads"""
+    with xor_fallback():
+        check_round_trip(QuantumShield(), XOR_VERSION)
+
+
+def test_aes_gcm_binary_round_trip():
+    """AES-GCM packages (0x0200) round-trip empty, tiny and multi-chunk payloads"""
+    if quantum_shield.Cipher is None:
+        print('   (cryptography not installed - AES-GCM round trip skipped)')
+        return
+    shield = QuantumShield()
+    check_round_trip(shield, AES_GCM_VERSION)
+
+    # The tag covers the payload - a wrong passphrase must not decrypt
+    package = shield.encrypt_data(payload(100), PASSPHRASE)
+    assert shield.decrypt_data(package, 'not-the-passphrase') is None
+
+
+def main():
+    tests = (test_legacy_v1_0_fixture, test_text_framing_other_versions_rejected,
+             test_xor_binary_round_trip, test_aes_gcm_binary_round_trip)
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f'✅ {test.__name__}')
+        except Exception as error:
+            failed += 1
+            print(f'❌ {test.__name__}: {error!r}')
+    print('Package formats:', 'FAIL' if failed else 'OK')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
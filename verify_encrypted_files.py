@@ -4,81 +4,93 @@ Usage: python scripts/shield/verify_encrypted_files.py <backup-zip-path> <passph
 """
 import sys
 import json
-import shutil
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
 from pathlib import Path
 from zipfile import ZipFile
 
 ROOT = Path(__file__).resolve().parents[2]
 MANIFEST = ROOT / 'csv-manifest.json'
 
-if len(sys.argv) < 3:
-    print('Usage: verify_encrypted_files.py <backup-zip-path> <passphrase>')
-    raise SystemExit(1)
-
-backup = Path(sys.argv[1])
-passphrase = sys.argv[2]
-
-if not backup.exists():
-    print('Backup not found:', backup)
-    raise SystemExit(1)
-
 try:
     from quantum_shield import QuantumShield
 except Exception as e:
     print('Shield import failed:', e)
     raise
 
-s = QuantumShield()
+# Per-process state, set once by the pool initializer
+_shield = None
+_passphrase = None
+_key = None
+_backup_zip = None
+
+
+def _init_worker(passphrase, key, backup):
+    """Pool initializer - one shield, passphrase and open backup zip per worker, not per item"""
+    global _shield, _passphrase, _key, _backup_zip
+    _shield = QuantumShield()
+    _passphrase = passphrase
+    _key = key
+    _backup_zip = ZipFile(backup, 'r')
+    Finalize(_backup_zip, _backup_zip.close, exitpriority=5)
+    # Pool workers leave through os._exit, which skips atexit - flush the audit log as they shut down
+    Finalize(_shield, _shield.flush_audit_log, exitpriority=10)
+
+
+def verify_one(item):
+    """Decrypt one manifest entry's .enc and compare it with the backup copy -> (rel, ok, message)"""
+    rel = Path(item['path'])
+    enc_path = ROOT / (str(rel) + '.enc')
+    if not enc_path.exists():
+        return rel, False, f'Missing .enc for {rel}'
+    # decrypt in memory - no temp copy of the .enc, no restored file on disk
+    plain = _shield.decrypt_data(enc_path.read_bytes(), _passphrase, key=_key)
+    if plain is None:
+        return rel, False, f'Decryption failed for {enc_path}'
+    # Read the original straight out of the zip - nothing is extracted to disk
+    try:
+        orig_from_backup = _backup_zip.read(rel.as_posix())
+    except KeyError:
+        return rel, False, f'Original not present in backup for {rel}'
+    if plain == orig_from_backup:
+        return rel, True, f'Verified: {rel}'
+    return rel, False, f'Mismatch after decrypt for {rel}'
+
+
+def main(argv):
+    if len(argv) < 3:
+        print('Usage: verify_encrypted_files.py <backup-zip-path> <passphrase>')
+        return 1
 
-with ZipFile(backup, 'r') as zf:
-    tmpdir = ROOT / 'tmp_verify'
-    if tmpdir.exists():
-        shutil.rmtree(tmpdir)
-    tmpdir.mkdir()
-    zf.extractall(path=tmpdir)
+    backup = Path(argv[1])
+    passphrase = argv[2]
+
+    if not backup.exists():
+        print('Backup not found:', backup)
+        return 1
+
+    with open(MANIFEST) as f:
+        manifest = json.load(f)
+    items = [it for it in manifest if it.get('sensitive')]
+    # Derive the master key once here - workers only do the cheap per-file step
+    key = QuantumShield().derive_key_once(passphrase)
+
+    # Entries are independent - spread them over all cores, results come back in manifest order
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(passphrase, key, backup)) as ex:
+        results = list(ex.map(verify_one, items, chunksize=16))
 
-    manifest = json.load(open(MANIFEST))
     failed = False
-    for it in manifest:
-        if not it.get('sensitive'):
-            continue
-        rel = Path(it['path'])
-        enc_path = ROOT / (str(rel) + '.enc')
-        if not enc_path.exists():
-            print('Missing .enc for', rel)
-            failed = True
-            continue
-        # copy enc to temp and decrypt
-        test_enc = tmpdir / (enc_path.name)
-        shutil.copy2(enc_path, test_enc)
-        ok = s.decrypt_file(test_enc, passphrase)
+    for rel, ok, message in results:
+        print(message)
         if not ok:
-            print('Decryption failed for', enc_path)
-            failed = True
-            continue
-        # compare restored file (in tmpdir path)
-        restored = test_enc.with_suffix('')  # decrypted wrote this
-        orig_from_backup = tmpdir / rel
-        if not orig_from_backup.exists():
-            print('Original not present in backup for', rel)
             failed = True
-            continue
-        if restored.exists():
-            if restored.read_bytes() == orig_from_backup.read_bytes():
-                print('Verified:', rel)
-            else:
-                print('Mismatch after decrypt for', rel)
-                failed = True
-            restored.unlink()
-        else:
-            print('Restored file missing:', restored)
-            failed = True
-
-    shutil.rmtree(tmpdir, ignore_errors=True)
 
-if failed:
-    print('Verification completed: FAIL')
-    raise SystemExit(1)
-else:
+    if failed:
+        print('Verification completed: FAIL')
+        return 1
     print('Verification completed: SUCCESS')
-    sys.exit(0)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
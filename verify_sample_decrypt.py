@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from quantum_shield import QuantumShield
+from quantum_shield import QuantumShield, Cipher
 
 s = QuantumShield()
 import os, sys
@@ -10,10 +11,22 @@ if not passphrase:
     sys.exit(1)
 paths = list(Path('enterprise/departments/executive').rglob('*.enc')) + list(Path('enterprise/departments/legal-compliance').rglob('*.enc'))
 print('Found .enc files:', len(paths))
+sample = sorted(paths)[:100]
+key = s.derive_key_once(passphrase)  # once, not per file
+
+def check(p):
+    return s.decrypt_data(p.read_bytes(), passphrase, key=key)
+
+if Cipher is not None:
+    # AES-GCM releases the GIL - overlap the file reads with the decrypts; lines are printed afterwards, in sorted order
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as ex:
+        results = list(ex.map(check, sample))
+else:
+    # The XOR fallback mostly holds the GIL - threads would only add overhead
+    results = [check(p) for p in sample]
+
 ok = 0
-for i,p in enumerate(sorted(paths)[:100]):
-    b = p.read_bytes()
-    dec = s.decrypt_data(b, passphrase)
+for i, (p, dec) in enumerate(zip(sample, results)):
     status = 'OK' if dec else 'FAIL'
     print(f'{i+1}. {p} -> {status}')
     if dec: